@@ -0,0 +1,63 @@
+"""Dense float32 vectors over a hashed (preference_type, value) feature space.
+
+Users and movies are projected into the same FEATURE_DIMENSIONS-wide space, so ranking a candidate
+is a single dot product between two packed arrays instead of a join over preference rows.
+"""
+
+import hashlib
+import math
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from app.models import PreferenceType
+
+FEATURE_DIMENSIONS = 256
+
+# Only the top-billed cast members say much about a movie
+TOP_BILLED_CAST = 10
+
+
+def feature_index(preference_type: PreferenceType, value: str) -> int:
+    digest = hashlib.blake2b(f"{preference_type.value}:{value.strip().lower()}".encode(), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % FEATURE_DIMENSIONS
+
+
+def pack_vector(features: Iterable[Tuple[PreferenceType, str, float]]) -> bytes:
+    """Accumulate weighted features into a packed float32 vector."""
+    vector = array("f", bytes(4 * FEATURE_DIMENSIONS))
+    for preference_type, value, weight in features:
+        vector[feature_index(preference_type, value)] += weight
+    return vector.tobytes()
+
+
+def unpack_vector(blob: bytes) -> array:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector
+
+
+def dot(left: bytes, right: bytes) -> float:
+    """Similarity of two packed vectors; vectors of a different width (stale layout) score 0."""
+    if len(left) != len(right):
+        return 0.0
+    return math.sumprod(unpack_vector(left), unpack_vector(right))
+
+
+def movie_features(
+    genres: Sequence[Dict[str, Any]],
+    keywords: Sequence[str],
+    cast: Sequence[Dict[str, Any]],
+    crew: Sequence[Dict[str, Any]],
+) -> List[Tuple[PreferenceType, str, float]]:
+    """Unit-weight features for a movie, taken from its TMDB details payload."""
+    features = [(PreferenceType.GENRE, str(genre["name"]), 1.0) for genre in genres if genre.get("name")]
+    features.extend((PreferenceType.KEYWORD, keyword, 1.0) for keyword in keywords)
+    features.extend(
+        (PreferenceType.ACTOR, str(member["name"]), 1.0) for member in cast[:TOP_BILLED_CAST] if member.get("name")
+    )
+    features.extend(
+        (PreferenceType.DIRECTOR, str(member["name"]), 1.0)
+        for member in crew
+        if member.get("job") == "Director" and member.get("name")
+    )
+    return features
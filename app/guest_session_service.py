@@ -0,0 +1,44 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.orm import lazyload
+from sqlmodel import Session, select
+
+from app.database import get_session, max_queries
+from app.models import GuestSession, GuestSessionCreate
+
+
+def hash_session_token(token: str) -> int:
+    """Signed 64-bit BLAKE2b digest of a session token, matching the BIGINT session_token_hash column."""
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def create_guest_session(data: GuestSessionCreate) -> GuestSession:
+    with get_session() as session:
+        guest_session = GuestSession(
+            session_token=data.session_token,
+            session_token_hash=hash_session_token(data.session_token),
+            expires_at=datetime.now(timezone.utc) + timedelta(days=data.expires_in_days),
+        )
+        session.add(guest_session)
+        session.commit()
+        session.refresh(guest_session)
+        return guest_session
+
+
+@max_queries(1)
+def get_guest_session_by_token(session: Session, token: str) -> Optional[GuestSession]:
+    """Find a guest session by its token through the 8-byte hash index, then confirm the full token.
+
+    Runs on every anonymous request, so the session's selectin collections are left unloaded until accessed.
+    """
+    guest_session = session.exec(
+        select(GuestSession).where(GuestSession.session_token_hash == hash_session_token(token)).options(lazyload("*"))
+    ).first()
+    if guest_session is None:
+        return None
+    if not secrets.compare_digest(guest_session.session_token, token):
+        return None
+    return guest_session
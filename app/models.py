@@ -1,7 +1,128 @@
-from sqlmodel import SQLModel, Field, Relationship, JSON, Column
+import re
+from enum import StrEnum
+from pydantic import ConfigDict, field_validator, model_validator
+from sqlalchemy import ColumnElement, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import (
+    SQLModel,
+    Field,
+    Relationship,
+    JSON,
+    BigInteger,
+    Column,
+    DDL,
+    DateTime,
+    Enum,
+    Index,
+    LargeBinary,
+    Text,
+    UniqueConstraint,
+    col,
+    func,
+    text,
+)
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from decimal import Decimal
+from typing import Optional, List, Dict, Any, Type, Union
+
+# Compiled once at import. Domain labels are matched one dot at a time, so the pattern cannot backtrack.
+_EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+(?:\.[a-zA-Z0-9-]+)+", re.ASCII)
+
+
+def _validate_email(value: str) -> str:
+    if _EMAIL_RE.fullmatch(value) is None:
+        raise ValueError("Invalid email address")
+    return value
+
+
+# Ingestion caps for free-text fields; longer input is cut rather than rejected
+OVERVIEW_MAX_LENGTH = 2000
+REASON_MAX_LENGTH = 500
+NOTES_MAX_LENGTH = 500
+# Width of the movie_keywords.keyword primary-key column
+KEYWORD_MAX_LENGTH = 255
+
+
+def _truncate(value: Any, limit: int) -> Any:
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit]
+    return value
+
+
+def _server_timestamp(on_update: bool = False) -> Column:
+    """Timestamp filled in by the database with now(), so inserts never bind it from Python."""
+    return Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now() if on_update else None,
+        nullable=False,
+    )
+
+
+def _timestamp(nullable: bool = True) -> Column:
+    """Timezone-aware timestamp set from Python or SQL, matching the server-filled ones."""
+    return Column(DateTime(timezone=True), nullable=nullable)
+
+
+def check_single_owner(user_id: Optional[int], guest_session_id: Optional[int]) -> None:
+    """Rows belong to either a user or a guest session, never both or neither."""
+    if (user_id is None) == (guest_session_id is None):
+        raise ValueError("Exactly one of user_id or guest_session_id must be set")
+
+
+def _enum_column(enum_cls: Type[StrEnum], length: int, nullable: bool = False, index: bool = False) -> Column:
+    """Short VARCHAR column holding the enum's values, guarded by a CHECK constraint."""
+    return Column(
+        Enum(
+            enum_cls,
+            native_enum=False,
+            create_constraint=True,
+            length=length,
+            values_callable=lambda members: [member.value for member in members],
+        ),
+        nullable=nullable,
+        index=index,
+    )
+
+
+# Enumerations for the fixed-vocabulary string fields
+
+
+class MediaType(StrEnum):
+    MOVIE = "movie"
+    TV = "tv"
+
+
+class PreferenceType(StrEnum):
+    GENRE = "genre"
+    ACTOR = "actor"
+    DIRECTOR = "director"
+    KEYWORD = "keyword"
+
+
+class PreferenceSource(StrEnum):
+    LIKED_MOVIE = "liked_movie"
+    DISLIKED_MOVIE = "disliked_movie"
+    MANUAL = "manual"
+
+
+class UserAction(StrEnum):
+    """Recorded outcome of a recommendation."""
+
+    LIKED = "liked"
+    DISLIKED = "disliked"
+    ADDED_TO_LIST = "added_to_list"
+    WATCHED_AND_LIKED = "watched_and_liked"
+    WATCHED_AND_DISLIKED = "watched_and_disliked"
+
+
+class SwipeActionKind(StrEnum):
+    """Gesture submitted from the swipe UI."""
+
+    LIKE = "like"
+    DISLIKE = "dislike"
+    WATCHED_AND_LIKED = "watched_and_liked"
+    WATCHED_AND_DISLIKED = "watched_and_disliked"
+    ADD_TO_LIST = "add_to_list"
 
 
 # Persistent models (stored in database)
@@ -14,18 +135,33 @@ class User(SQLModel, table=True):
 
     id: Optional[int] = Field(default=None, primary_key=True)
     username: str = Field(unique=True, max_length=50)
-    email: str = Field(unique=True, max_length=255, regex=r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+    email: str = Field(unique=True, max_length=255)
     password_hash: str = Field(max_length=255)
     display_name: str = Field(max_length=100)
     is_active: bool = Field(default=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    last_login_at: Optional[datetime] = Field(default=None)
+    created_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
+    last_login_at: Optional[datetime] = Field(default=None, sa_column=_timestamp())
+    # Packed float32 taste vector over the hashed feature space; NULL until (re)computed
+    preference_vector: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
 
     # Relationships
-    viewing_history: List["ViewingHistory"] = Relationship(back_populates="user")
-    watching_lists: List["WatchingList"] = Relationship(back_populates="user")
-    preferences: List["UserPreference"] = Relationship(back_populates="user")
-    recommendations: List["Recommendation"] = Relationship(back_populates="user")
+    viewing_history: List["ViewingHistory"] = Relationship(
+        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+    )
+    watching_lists: List["WatchingList"] = Relationship(
+        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+    )
+    preferences: List["UserPreference"] = Relationship(
+        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+    )
+    recommendations: List["Recommendation"] = Relationship(
+        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+    )
+
+    @field_validator("email")
+    @classmethod
+    def _check_email(cls, value: str) -> str:
+        return _validate_email(value)
 
 
 class GuestSession(SQLModel, table=True):
@@ -34,82 +170,158 @@ class GuestSession(SQLModel, table=True):
     __tablename__ = "guest_sessions"  # type: ignore[assignment]
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    session_token: str = Field(unique=True, max_length=255, index=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    last_active_at: datetime = Field(default_factory=datetime.utcnow)
-    expires_at: datetime = Field()
+    session_token: str = Field(max_length=255)
+    # Fixed-width 64-bit hash of session_token; lookups probe this instead of a 255-char string index
+    session_token_hash: int = Field(sa_column=Column(BigInteger, unique=True, index=True, nullable=False))
+    created_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
+    last_active_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
+    expires_at: datetime = Field(sa_column=_timestamp(nullable=False))
+    # Packed float32 taste vector over the hashed feature space; NULL until (re)computed
+    preference_vector: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
 
     # Relationships
-    viewing_history: List["ViewingHistory"] = Relationship(back_populates="guest_session")
-    watching_lists: List["WatchingList"] = Relationship(back_populates="guest_session")
-    preferences: List["UserPreference"] = Relationship(back_populates="guest_session")
-    recommendations: List["Recommendation"] = Relationship(back_populates="guest_session")
+    viewing_history: List["ViewingHistory"] = Relationship(
+        back_populates="guest_session", sa_relationship_kwargs={"lazy": "selectin"}
+    )
+    watching_lists: List["WatchingList"] = Relationship(
+        back_populates="guest_session", sa_relationship_kwargs={"lazy": "selectin"}
+    )
+    preferences: List["UserPreference"] = Relationship(
+        back_populates="guest_session", sa_relationship_kwargs={"lazy": "selectin"}
+    )
+    recommendations: List["Recommendation"] = Relationship(
+        back_populates="guest_session", sa_relationship_kwargs={"lazy": "selectin"}
+    )
 
 
 class Movie(SQLModel, table=True):
     """Movie or TV show from TMDB."""
 
     __tablename__ = "movies"  # type: ignore[assignment]
+    # Keyset pagination of the popular feed: ORDER BY popularity DESC, id DESC over popular rows only
+    __table_args__ = (Index("ix_movies_popular_keyset", "popularity", "id", postgresql_where=text("is_popular")),)
 
     id: Optional[int] = Field(default=None, primary_key=True)
     tmdb_id: int = Field(unique=True, index=True)
     title: str = Field(max_length=255)
     original_title: str = Field(max_length=255)
-    overview: str = Field(default="", max_length=2000)
+    overview: str = Field(default="", sa_column=Column(Text, nullable=False))
     poster_path: Optional[str] = Field(default=None, max_length=255)
     backdrop_path: Optional[str] = Field(default=None, max_length=255)
-    release_date: Optional[datetime] = Field(default=None)
+    release_date: Optional[datetime] = Field(default=None, sa_column=_timestamp())
     runtime: Optional[int] = Field(default=None)  # in minutes
-    vote_average: Decimal = Field(default=Decimal("0"), decimal_places=1)
+    vote_average: float = Field(default=0.0)
     vote_count: int = Field(default=0)
-    popularity: Decimal = Field(default=Decimal("0"), decimal_places=3)
+    popularity: float = Field(default=0.0)
     adult: bool = Field(default=False)
-    media_type: str = Field(max_length=20)  # 'movie' or 'tv'
+    media_type: MediaType = Field(sa_column=_enum_column(MediaType, length=20))
 
     # For TV shows
-    first_air_date: Optional[datetime] = Field(default=None)
+    first_air_date: Optional[datetime] = Field(default=None, sa_column=_timestamp())
     number_of_seasons: Optional[int] = Field(default=None)
     number_of_episodes: Optional[int] = Field(default=None)
 
+    is_popular: bool = Field(default=False, index=True)  # For curated popular content
+    created_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
+    updated_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp(on_update=True))
+
+    # Relationships (reverse fan-outs span every user, so they stay lazy rather than
+    # being pulled in by the joined ``movie`` loads on the owning side)
+    viewing_history: List["ViewingHistory"] = Relationship(
+        back_populates="movie", sa_relationship_kwargs={"lazy": "select"}
+    )
+    watching_list_items: List["WatchingListItem"] = Relationship(
+        back_populates="movie", sa_relationship_kwargs={"lazy": "select"}
+    )
+    recommendations: List["Recommendation"] = Relationship(
+        back_populates="movie", sa_relationship_kwargs={"lazy": "select"}
+    )
+    # Never loaded implicitly; detail pages opt in with selectinload(Movie.details)
+    details: Optional["MovieDetails"] = Relationship(back_populates="movie", sa_relationship_kwargs={"lazy": "noload"})
+
+
+class MovieDetails(SQLModel, table=True):
+    """Bulky TMDB metadata for a movie, kept out of the hot movies rows read by lists and feeds."""
+
+    __tablename__ = "movie_details"  # type: ignore[assignment]
+    # Fallback for ad-hoc JSON containment queries; candidate lookups use MovieKeyword instead
+    __table_args__ = (Index("ix_movie_details_keywords_gin", "keywords", postgresql_using="gin"),)
+
+    movie_id: int = Field(foreign_key="movies.id", primary_key=True)
+
     # JSON fields for complex data
     genres: List[Dict[str, Any]] = Field(default=[], sa_column=Column(JSON))
     spoken_languages: List[Dict[str, Any]] = Field(default=[], sa_column=Column(JSON))
     production_countries: List[Dict[str, Any]] = Field(default=[], sa_column=Column(JSON))
     production_companies: List[Dict[str, Any]] = Field(default=[], sa_column=Column(JSON))
-    keywords: List[str] = Field(default=[], sa_column=Column(JSON))
+    keywords: List[str] = Field(default=[], sa_column=Column(JSON().with_variant(JSONB(), "postgresql")))
     cast: List[Dict[str, Any]] = Field(default=[], sa_column=Column(JSON))
     crew: List[Dict[str, Any]] = Field(default=[], sa_column=Column(JSON))
 
-    is_popular: bool = Field(default=False, index=True)  # For curated popular content
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-
     # Relationships
-    viewing_history: List["ViewingHistory"] = Relationship(back_populates="movie")
-    watching_list_items: List["WatchingListItem"] = Relationship(back_populates="movie")
-    recommendations: List["Recommendation"] = Relationship(back_populates="movie")
+    movie: Movie = Relationship(back_populates="details")
+
+
+class MovieKeyword(SQLModel, table=True):
+    """Normalized movie keywords, so candidate generation is an index lookup rather than a JSON scan."""
+
+    __tablename__ = "movie_keywords"  # type: ignore[assignment]
+    __table_args__ = (Index("ix_mk_keyword", "keyword"),)
+
+    movie_id: int = Field(foreign_key="movies.id", primary_key=True)
+    keyword: str = Field(max_length=KEYWORD_MAX_LENGTH, primary_key=True)
+
+
+class MovieGenre(SQLModel, table=True):
+    """Normalized TMDB genre ids per movie."""
+
+    __tablename__ = "movie_genres"  # type: ignore[assignment]
+    __table_args__ = (Index("ix_mg_genre", "genre_id"),)
+
+    movie_id: int = Field(foreign_key="movies.id", primary_key=True)
+    genre_id: int = Field(primary_key=True)
+
+
+class MovieFeatureVector(SQLModel, table=True):
+    """Packed float32 vector of a movie's genres, keywords, cast and directors, computed on catalog refresh.
+
+    Kept beside the movies table, so only ranking reads the 1 KB blob and movie rows stay narrow.
+    """
+
+    __tablename__ = "movie_feature_vectors"  # type: ignore[assignment]
+
+    movie_id: int = Field(foreign_key="movies.id", primary_key=True)
+    feature_vector: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
 
 
 class ViewingHistory(SQLModel, table=True):
     """User's viewing history with preferences."""
 
     __tablename__ = "viewing_history"  # type: ignore[assignment]
+    __table_args__ = (
+        # One row per owner and title; also the conflict targets of the swipe upsert
+        UniqueConstraint("user_id", "movie_id", name="uq_vh_user_movie"),
+        UniqueConstraint("guest_session_id", "movie_id", name="uq_vh_guest_movie"),
+        Index("ix_vh_user_watched_at", "user_id", "watched_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: Optional[int] = Field(default=None, foreign_key="users.id", index=True)
-    guest_session_id: Optional[int] = Field(default=None, foreign_key="guest_sessions.id", index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="users.id")
+    guest_session_id: Optional[int] = Field(default=None, foreign_key="guest_sessions.id")
     movie_id: int = Field(foreign_key="movies.id", index=True)
 
     # User's reaction to the content
     liked: bool = Field()  # True for liked, False for disliked
-    watched_at: datetime = Field(default_factory=datetime.utcnow)
+    watched_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
     rating: Optional[int] = Field(default=None, ge=1, le=10)  # Optional user rating 1-10
-    notes: Optional[str] = Field(default=None, max_length=500)
+    notes: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))
 
     # Relationships
     user: Optional[User] = Relationship(back_populates="viewing_history")
     guest_session: Optional[GuestSession] = Relationship(back_populates="viewing_history")
-    movie: Movie = Relationship(back_populates="viewing_history")
+    movie: Movie = Relationship(
+        back_populates="viewing_history", sa_relationship_kwargs={"lazy": "joined", "innerjoin": True}
+    )
 
 
 class WatchingList(SQLModel, table=True):
@@ -124,50 +336,62 @@ class WatchingList(SQLModel, table=True):
     name: str = Field(max_length=100)
     description: Optional[str] = Field(default=None, max_length=500)
     is_default: bool = Field(default=False)  # Default list like "Watch Later"
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
 
     # Relationships
     user: Optional[User] = Relationship(back_populates="watching_lists")
     guest_session: Optional[GuestSession] = Relationship(back_populates="watching_lists")
-    items: List["WatchingListItem"] = Relationship(back_populates="watching_list")
+    items: List["WatchingListItem"] = Relationship(
+        back_populates="watching_list", sa_relationship_kwargs={"lazy": "selectin"}
+    )
 
 
 class WatchingListItem(SQLModel, table=True):
     """Items in a watching list."""
 
     __tablename__ = "watching_list_items"  # type: ignore[assignment]
+    __table_args__ = (
+        UniqueConstraint("watching_list_id", "movie_id", name="uq_wli_list_movie"),
+        Index("ix_wli_list_priority", "watching_list_id", "priority"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    watching_list_id: int = Field(foreign_key="watching_lists.id", index=True)
+    watching_list_id: int = Field(foreign_key="watching_lists.id")
     movie_id: int = Field(foreign_key="movies.id", index=True)
-    added_at: datetime = Field(default_factory=datetime.utcnow)
+    added_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
     priority: int = Field(default=0)  # For ordering within list
 
     # Relationships
     watching_list: WatchingList = Relationship(back_populates="items")
-    movie: Movie = Relationship(back_populates="watching_list_items")
+    movie: Movie = Relationship(
+        back_populates="watching_list_items", sa_relationship_kwargs={"lazy": "joined", "innerjoin": True}
+    )
 
 
 class UserPreference(SQLModel, table=True):
     """User preferences for recommendation algorithm."""
 
     __tablename__ = "user_preferences"  # type: ignore[assignment]
+    __table_args__ = (
+        UniqueConstraint("user_id", "preference_type", "preference_value", name="uq_pref_user_type_value"),
+        UniqueConstraint("guest_session_id", "preference_type", "preference_value", name="uq_pref_guest_type_value"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: Optional[int] = Field(default=None, foreign_key="users.id", index=True)
-    guest_session_id: Optional[int] = Field(default=None, foreign_key="guest_sessions.id", index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="users.id")
+    guest_session_id: Optional[int] = Field(default=None, foreign_key="guest_sessions.id")
 
     # Preference types and values
-    preference_type: str = Field(max_length=50, index=True)  # 'genre', 'actor', 'director', 'keyword', etc.
+    preference_type: PreferenceType = Field(sa_column=_enum_column(PreferenceType, length=50, index=True))
     preference_value: str = Field(max_length=255, index=True)  # The actual value
-    weight: Decimal = Field(default=Decimal("1.0"), decimal_places=2)  # Preference strength
+    weight: float = Field(default=1.0)  # Preference strength
 
     # Context for the preference
-    source: str = Field(max_length=50)  # 'liked_movie', 'disliked_movie', 'manual'
+    source: PreferenceSource = Field(sa_column=_enum_column(PreferenceSource, length=50))
     source_movie_id: Optional[int] = Field(default=None, foreign_key="movies.id")
 
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
+    updated_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp(on_update=True))
 
     # Relationships
     user: Optional[User] = Relationship(back_populates="preferences")
@@ -178,44 +402,73 @@ class Recommendation(SQLModel, table=True):
     """AI-generated recommendations for users."""
 
     __tablename__ = "recommendations"  # type: ignore[assignment]
+    __table_args__ = (
+        Index("ix_rec_user_expires_score", "user_id", "expires_at", "score"),
+        Index("ix_rec_guest_expires_score", "guest_session_id", "expires_at", "score"),
+        # Pending (not yet shown) recommendations in swipe feed order (score, then id, both descending).
+        # Every recommendations column the feed filters on or returns is in the index, so with a current
+        # visibility map the feed reads recommendations from the index alone
+        Index(
+            "ix_rec_pending",
+            "user_id",
+            "score",
+            "id",
+            postgresql_where=text("shown_at IS NULL"),
+            postgresql_include=["movie_id", "reason", "recommendation_type", "expires_at"],
+        ),
+        Index(
+            "ix_rec_guest_pending",
+            "guest_session_id",
+            "score",
+            "id",
+            postgresql_where=text("shown_at IS NULL"),
+            postgresql_include=["movie_id", "reason", "recommendation_type", "expires_at"],
+        ),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: Optional[int] = Field(default=None, foreign_key="users.id", index=True)
-    guest_session_id: Optional[int] = Field(default=None, foreign_key="guest_sessions.id", index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="users.id")
+    guest_session_id: Optional[int] = Field(default=None, foreign_key="guest_sessions.id")
     movie_id: int = Field(foreign_key="movies.id", index=True)
 
     # Recommendation details
-    score: Decimal = Field(decimal_places=4)  # AI confidence score 0-1
-    reason: str = Field(max_length=500)  # AI-generated reason
+    score: float = Field()  # AI confidence score 0-1
+    reason: str = Field(sa_column=Column(Text, nullable=False))  # AI-generated reason
     recommendation_type: str = Field(max_length=50)  # 'similar_genre', 'similar_cast', 'ai_generated', etc.
 
     # User interaction with recommendation
-    shown_at: Optional[datetime] = Field(default=None)
-    user_action: Optional[str] = Field(
-        default=None, max_length=50
-    )  # 'liked', 'disliked', 'added_to_list', 'watched_and_liked', etc.
-    user_action_at: Optional[datetime] = Field(default=None)
+    shown_at: Optional[datetime] = Field(default=None, sa_column=_timestamp())
+    user_action: Optional[UserAction] = Field(
+        default=None, sa_column=_enum_column(UserAction, length=50, nullable=True)
+    )
+    user_action_at: Optional[datetime] = Field(default=None, sa_column=_timestamp())
 
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    expires_at: Optional[datetime] = Field(default=None)  # For recommendation freshness
+    created_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
+    expires_at: Optional[datetime] = Field(default=None, sa_column=_timestamp())  # For recommendation freshness
 
     # Relationships
     user: Optional[User] = Relationship(back_populates="recommendations")
     guest_session: Optional[GuestSession] = Relationship(back_populates="recommendations")
-    movie: Movie = Relationship(back_populates="recommendations")
+    movie: Movie = Relationship(
+        back_populates="recommendations", sa_relationship_kwargs={"lazy": "joined", "innerjoin": True}
+    )
 
 
 class SwipeSession(SQLModel, table=True):
     """Tracks swiping sessions for recommendation flow."""
 
     __tablename__ = "swipe_sessions"  # type: ignore[assignment]
+    __table_args__ = (
+        Index("ix_swipe_user_started", "user_id", "started_at"),
+        Index("ix_swipe_guest_started", "guest_session_id", "started_at"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: Optional[int] = Field(default=None, foreign_key="users.id", index=True)
-    guest_session_id: Optional[int] = Field(default=None, foreign_key="guest_sessions.id", index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="users.id")
+    guest_session_id: Optional[int] = Field(default=None, foreign_key="guest_sessions.id")
 
-    started_at: datetime = Field(default_factory=datetime.utcnow)
-    ended_at: Optional[datetime] = Field(default=None)
+    started_at: Optional[datetime] = Field(default=None, sa_column=_server_timestamp())
+    ended_at: Optional[datetime] = Field(default=None, sa_column=_timestamp())
     total_swipes: int = Field(default=0)
     likes: int = Field(default=0)
     dislikes: int = Field(default=0)
@@ -224,55 +477,104 @@ class SwipeSession(SQLModel, table=True):
     added_to_list: int = Field(default=0)
 
 
+def owner_filter(
+    model: Union[Type[Recommendation], Type[UserPreference], Type[ViewingHistory]],
+    user_id: Optional[int],
+    guest_session_id: Optional[int],
+) -> ColumnElement[bool]:
+    """WHERE clause selecting the model's rows of a user, or of a guest session if no user is given."""
+    if user_id is not None:
+        return col(model.user_id) == user_id
+    return col(model.guest_session_id) == guest_session_id
+
+
+# Swipe notes are written often and read rarely: store them out of line uncompressed (EXTERNAL) so
+# history rows stay narrow. Overviews keep the default (EXTENDED, compressed) storage: every card reads them.
+event.listen(
+    SQLModel.metadata.tables["viewing_history"],
+    "after_create",
+    DDL("ALTER TABLE viewing_history ALTER COLUMN notes SET STORAGE EXTERNAL").execute_if(dialect="postgresql"),
+)
+
+
 # Non-persistent schemas (for validation, forms, API requests/responses)
 
+# Schemas are validated on every request: immutable, no extra keys, surrounding whitespace trimmed
+_SCHEMA_CONFIG = ConfigDict(frozen=True, extra="forbid", populate_by_name=True, str_strip_whitespace=True)
+# Same, but strings are kept verbatim, for schemas carrying passwords
+_RAW_STR_SCHEMA_CONFIG = ConfigDict(frozen=True, extra="forbid", populate_by_name=True)
+
 
 class UserCreate(SQLModel, table=False):
+    model_config = _RAW_STR_SCHEMA_CONFIG  # type: ignore[assignment]
+
     username: str = Field(max_length=50)
     email: str = Field(max_length=255)
     password: str = Field(min_length=8)
     display_name: str = Field(max_length=100)
 
+    @field_validator("email")
+    @classmethod
+    def _check_email(cls, value: str) -> str:
+        return _validate_email(value)
+
 
 class UserUpdate(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     display_name: Optional[str] = Field(default=None, max_length=100)
     email: Optional[str] = Field(default=None, max_length=255)
 
+    @field_validator("email")
+    @classmethod
+    def _check_email(cls, value: Optional[str]) -> Optional[str]:
+        return _validate_email(value) if value is not None else None
+
 
 class UserLogin(SQLModel, table=False):
+    model_config = _RAW_STR_SCHEMA_CONFIG  # type: ignore[assignment]
+
     username_or_email: str = Field(max_length=255)
     password: str = Field()
 
 
 class GuestSessionCreate(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     session_token: str = Field(max_length=255)
     expires_in_days: int = Field(default=30, ge=1, le=365)
 
 
 class MovieSearch(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     query: str = Field(max_length=255)
-    media_type: Optional[str] = Field(default=None)  # 'movie', 'tv', or None for both
+    media_type: Optional[MediaType] = Field(default=None)  # None for both
     genre_ids: Optional[List[int]] = Field(default=None)
     year: Optional[int] = Field(default=None)
     page: int = Field(default=1, ge=1)
+    cursor: Optional[str] = Field(default=None)  # Opaque keyset cursor; takes precedence over page
 
 
 class MovieUpdate(SQLModel, table=False):
     """For updating movie data from TMDB."""
 
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     tmdb_id: int
     title: str = Field(max_length=255)
     original_title: str = Field(max_length=255)
-    overview: str = Field(default="", max_length=2000)
+    overview: str = Field(default="", max_length=OVERVIEW_MAX_LENGTH)
     poster_path: Optional[str] = Field(default=None, max_length=255)
     backdrop_path: Optional[str] = Field(default=None, max_length=255)
     release_date: Optional[str] = Field(default=None)  # Will be converted to datetime
+    first_air_date: Optional[str] = Field(default=None)  # TV shows only, converted like release_date
     runtime: Optional[int] = Field(default=None)
-    vote_average: Decimal = Field(decimal_places=1)
+    vote_average: float
     vote_count: int
-    popularity: Decimal = Field(decimal_places=3)
+    popularity: float
     adult: bool = Field(default=False)
-    media_type: str = Field(max_length=20)
+    media_type: MediaType
     genres: List[Dict[str, Any]] = Field(default=[])
     spoken_languages: List[Dict[str, Any]] = Field(default=[])
     production_countries: List[Dict[str, Any]] = Field(default=[])
@@ -281,58 +583,158 @@ class MovieUpdate(SQLModel, table=False):
     cast: List[Dict[str, Any]] = Field(default=[])
     crew: List[Dict[str, Any]] = Field(default=[])
 
+    @field_validator("overview", mode="before")
+    @classmethod
+    def _truncate_overview(cls, value: Any) -> Any:
+        return _truncate(value, OVERVIEW_MAX_LENGTH)
+
+    # Checked here so a bad row fails parse_movie_batch() instead of aborting an upsert halfway through
+    @field_validator("release_date", "first_air_date")
+    @classmethod
+    def _check_date(cls, value: Optional[str]) -> Optional[str]:
+        if not value:
+            return None  # TMDB sends an empty string for unknown dates
+        datetime.fromisoformat(value)  # raises ValueError on malformed dates
+        return value
+
+    @field_validator("keywords")
+    @classmethod
+    def _check_keywords(cls, value: List[str]) -> List[str]:
+        if any(len(keyword) > KEYWORD_MAX_LENGTH for keyword in value):
+            raise ValueError(f"Keywords must be at most {KEYWORD_MAX_LENGTH} characters")
+        return value
+
+
+class MovieBulkUpsert(SQLModel, table=False):
+    """Batch of TMDB movies written in a single upsert pass."""
+
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
+    movies: List[MovieUpdate]
+
 
 class ViewingHistoryCreate(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     movie_id: int
     liked: bool
     rating: Optional[int] = Field(default=None, ge=1, le=10)
-    notes: Optional[str] = Field(default=None, max_length=500)
+    notes: Optional[str] = Field(default=None, max_length=NOTES_MAX_LENGTH)
+
+    @field_validator("notes", mode="before")
+    @classmethod
+    def _truncate_notes(cls, value: Any) -> Any:
+        return _truncate(value, NOTES_MAX_LENGTH)
+
+
+class HistoryBatchCreate(SQLModel, table=False):
+    """Swipes of one user or guest session, written to the database in a single batch."""
+
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
+    user_id: Optional[int] = Field(default=None)
+    guest_session_id: Optional[int] = Field(default=None)
+    items: List[ViewingHistoryCreate] = Field(default=[])
+    recommendation_actions: Dict[int, UserAction] = Field(default={})  # recommendation id -> outcome
+
+    @model_validator(mode="after")
+    def _check_single_owner(self) -> "HistoryBatchCreate":
+        check_single_owner(self.user_id, self.guest_session_id)
+        return self
 
 
 class WatchingListCreate(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     name: str = Field(max_length=100)
     description: Optional[str] = Field(default=None, max_length=500)
 
 
 class WatchingListUpdate(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     name: Optional[str] = Field(default=None, max_length=100)
     description: Optional[str] = Field(default=None, max_length=500)
 
 
 class WatchingListItemCreate(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     watching_list_id: int
     movie_id: int
     priority: int = Field(default=0)
 
 
+class UserPreferenceCreate(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
+    preference_type: PreferenceType
+    preference_value: str = Field(max_length=255)
+    weight: float = Field(default=1.0)
+    source: PreferenceSource
+    source_movie_id: Optional[int] = Field(default=None)
+
+
 class RecommendationCreate(SQLModel, table=False):
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     movie_id: int
-    score: Decimal = Field(decimal_places=4)
-    reason: str = Field(max_length=500)
+    score: float
+    reason: str = Field(max_length=REASON_MAX_LENGTH)
     recommendation_type: str = Field(max_length=50)
     expires_in_days: Optional[int] = Field(default=None, ge=1)
 
+    @field_validator("reason", mode="before")
+    @classmethod
+    def _truncate_reason(cls, value: Any) -> Any:
+        return _truncate(value, REASON_MAX_LENGTH)
+
 
 class RecommendationUpdate(SQLModel, table=False):
-    user_action: str = Field(max_length=50)  # 'liked', 'disliked', 'added_to_list', etc.
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
+    user_action: UserAction
 
 
 class SwipeAction(SQLModel, table=False):
     """Schema for handling swipe actions."""
 
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     recommendation_id: int
-    action: str = Field(max_length=50)  # 'like', 'dislike', 'watched_and_liked', 'watched_and_disliked', 'add_to_list'
+    action: SwipeActionKind
     watching_list_id: Optional[int] = Field(default=None)  # For 'add_to_list' action
     rating: Optional[int] = Field(default=None, ge=1, le=10)  # For watched actions
-    notes: Optional[str] = Field(default=None, max_length=500)  # For watched actions
+    notes: Optional[str] = Field(default=None, max_length=NOTES_MAX_LENGTH)  # For watched actions
+
+    @field_validator("notes", mode="before")
+    @classmethod
+    def _truncate_notes(cls, value: Any) -> Any:
+        return _truncate(value, NOTES_MAX_LENGTH)
+
+
+class SwipeCard(SQLModel, table=False):
+    """What the swipe UI shows for one pending recommendation, read straight from a column projection."""
+
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
+    recommendation_id: int
+    movie_id: int
+    title: str
+    poster_path: Optional[str] = None
+    overview: str  # First SWIPE_CARD_OVERVIEW_LENGTH characters only
+    score: float
+    reason: str
 
 
 class RecommendationResponse(SQLModel, table=False):
     """Response schema for recommendations with movie details."""
 
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     id: int
     movie_id: int
-    score: Decimal
+    score: float
     reason: str
     recommendation_type: str
     created_at: str  # ISO format
@@ -342,7 +744,10 @@ class RecommendationResponse(SQLModel, table=False):
 class PopularMoviesResponse(SQLModel, table=False):
     """Response schema for popular movies list."""
 
+    model_config = _SCHEMA_CONFIG  # type: ignore[assignment]
+
     movies: List[Dict[str, Any]]
     page: int
     total_pages: int
     total_results: int
+    next_cursor: Optional[str] = None  # Pass back as cursor to fetch the following page
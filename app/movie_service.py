@@ -0,0 +1,281 @@
+import base64
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import TypeAdapter
+
+from sqlalchemy import event
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, col, delete, desc, func, select, tuple_
+
+from app.database import dialect_insert, get_session, max_queries
+from app.feature_vectors import movie_features, pack_vector
+from app.models import (
+    MediaType,
+    Movie,
+    MovieBulkUpsert,
+    MovieDetails,
+    MovieFeatureVector,
+    MovieGenre,
+    MovieKeyword,
+    MovieUpdate,
+    PopularMoviesResponse,
+)
+
+# Rows per INSERT statement; large enough to amortize round-trips, small enough to bound statement size
+BULK_UPSERT_CHUNK_SIZE = 1000
+
+# Built once at import and reused for every batch; validates a whole TMDB page in a single call
+_MOVIE_UPDATES_ADAPTER = TypeAdapter(List[MovieUpdate])
+
+# Bulky TMDB payload fields stored on MovieDetails rather than the hot movies table
+_DETAIL_COLUMNS = tuple(name for name in MovieDetails.model_fields if name != "movie_id")
+
+# Columns refreshed when a movie already exists (created_at and is_popular are left untouched)
+_REFRESHED_COLUMNS = tuple(
+    name for name in MovieUpdate.model_fields if name != "tmdb_id" and name not in _DETAIL_COLUMNS
+)
+
+
+POPULAR_PAGE_SIZE = 20
+POPULAR_CACHE_TTL_SECONDS = 60.0
+# Cursors come from clients, so the number of distinct keys is bounded here rather than by the catalog
+POPULAR_CACHE_MAX_ENTRIES = 256
+
+# Process-level cache of popular-movie pages: (page, media_type, cursor) -> (stored_at, response)
+POPULAR_CACHE: Dict[Tuple[int, Optional[MediaType], Optional[str]], Tuple[float, PopularMoviesResponse]] = {}
+# Bumped on every committed catalog refresh; a page loaded under an older version is not cached
+POPULAR_VERSION = 0
+
+# Session.info flag: this transaction wrote catalog rows, so committing it invalidates the popular cache
+_CATALOG_CHANGED = "popular_cache_stale"
+
+
+def _parse_tmdb_date(value: Optional[str]) -> Optional[datetime]:
+    """TMDB dates come as 'YYYY-MM-DD' or an empty string; stored as UTC midnight."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _movie_rows(movies: List[MovieUpdate]) -> List[Dict[str, Any]]:
+    # Release dates repeat heavily across a catalog page, so parse each distinct string once per batch
+    raw_dates = {movie.release_date for movie in movies} | {movie.first_air_date for movie in movies}
+    dates = {value: _parse_tmdb_date(value) for value in raw_dates}
+
+    rows = []
+    for movie in movies:
+        row = movie.model_dump(exclude=set(_DETAIL_COLUMNS))
+        row["release_date"] = dates[movie.release_date]
+        row["first_air_date"] = dates[movie.first_air_date]
+        row["is_popular"] = False
+        rows.append(row)
+    return rows
+
+
+def _details_rows(movies: List[MovieUpdate], movie_ids: Dict[int, int]) -> List[Dict[str, Any]]:
+    return [
+        {"movie_id": movie_ids[movie.tmdb_id], **movie.model_dump(include=set(_DETAIL_COLUMNS))} for movie in movies
+    ]
+
+
+def _vector_rows(movies: List[MovieUpdate], movie_ids: Dict[int, int]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "movie_id": movie_ids[movie.tmdb_id],
+            "feature_vector": pack_vector(movie_features(movie.genres, movie.keywords, movie.cast, movie.crew)),
+        }
+        for movie in movies
+    ]
+
+
+def _tag_rows(
+    movies: List[MovieUpdate], movie_ids: Dict[int, int]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    keyword_rows = []
+    genre_rows = []
+    for movie in movies:
+        movie_id = movie_ids[movie.tmdb_id]
+        keyword_rows.extend({"movie_id": movie_id, "keyword": keyword} for keyword in dict.fromkeys(movie.keywords))
+        genre_ids = dict.fromkeys(genre["id"] for genre in movie.genres if isinstance(genre.get("id"), int))
+        genre_rows.extend({"movie_id": movie_id, "genre_id": genre_id} for genre_id in genre_ids)
+    return keyword_rows, genre_rows
+
+
+def _replace_tags(session: Session, movies: List[MovieUpdate], movie_ids: Dict[int, int]) -> None:
+    """Rewrite the keyword/genre join rows of a chunk to mirror its MovieDetails payload."""
+    ids = list(movie_ids.values())
+    session.execute(delete(MovieKeyword).where(col(MovieKeyword.movie_id).in_(ids)))
+    session.execute(delete(MovieGenre).where(col(MovieGenre.movie_id).in_(ids)))
+
+    keyword_rows, genre_rows = _tag_rows(movies, movie_ids)
+    if keyword_rows:
+        session.execute(dialect_insert(session, MovieKeyword).values(keyword_rows))
+    if genre_rows:
+        session.execute(dialect_insert(session, MovieGenre).values(genre_rows))
+
+
+def parse_movie_batch(raw_movies: Sequence[Dict[str, Any]]) -> MovieBulkUpsert:
+    """Validate raw TMDB movie dicts into a bulk upsert payload."""
+    return MovieBulkUpsert(movies=_MOVIE_UPDATES_ADAPTER.validate_python(raw_movies))
+
+
+def bulk_upsert_movies(session: Session, payload: MovieBulkUpsert) -> int:
+    """Insert new movies and refresh existing ones (matched on tmdb_id) in chunked multi-row upserts.
+
+    The caller owns the transaction and is responsible for committing; cached popular pages are
+    dropped once that commit succeeds. Returns the number of distinct movies written.
+    """
+    # A single statement cannot update the same row twice, so keep the last entry per tmdb_id
+    movies = list({movie.tmdb_id: movie for movie in payload.movies}.values())
+
+    for start in range(0, len(movies), BULK_UPSERT_CHUNK_SIZE):
+        chunk = movies[start : start + BULK_UPSERT_CHUNK_SIZE]
+
+        stmt = dialect_insert(session, Movie).values(_movie_rows(chunk))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tmdb_id"],
+            set_={
+                **{name: stmt.excluded[name] for name in _REFRESHED_COLUMNS},
+                "updated_at": func.now(),
+            },
+        ).returning(col(Movie.tmdb_id), col(Movie.id))
+        movie_ids: Dict[int, int] = {tmdb_id: movie_id for tmdb_id, movie_id in session.execute(stmt)}
+
+        details_stmt = dialect_insert(session, MovieDetails).values(_details_rows(chunk, movie_ids))
+        details_stmt = details_stmt.on_conflict_do_update(
+            index_elements=["movie_id"],
+            set_={name: details_stmt.excluded[name] for name in _DETAIL_COLUMNS},
+        )
+        session.execute(details_stmt)
+
+        vectors_stmt = dialect_insert(session, MovieFeatureVector).values(_vector_rows(chunk, movie_ids))
+        vectors_stmt = vectors_stmt.on_conflict_do_update(
+            index_elements=["movie_id"], set_={"feature_vector": vectors_stmt.excluded.feature_vector}
+        )
+        session.execute(vectors_stmt)
+        _replace_tags(session, chunk, movie_ids)
+
+    session.info[_CATALOG_CHANGED] = True
+    return len(movies)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_catalog_commit(session: Session) -> None:
+    # Only after the commit: a reader racing an earlier invalidation would re-cache pre-commit rows
+    if session.info.pop(_CATALOG_CHANGED, False):
+        invalidate_popular_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_change(session: Session) -> None:
+    session.info.pop(_CATALOG_CHANGED, None)
+
+
+@max_queries(2)
+def get_movie_with_details(session: Session, movie_id: int) -> Optional[Movie]:
+    """Load a movie together with its TMDB details, for detail pages only."""
+    # populate_existing so a movie already in the identity map (with details noloaded) gets them filled in
+    stmt = (
+        select(Movie)
+        .where(Movie.id == movie_id)
+        .options(selectinload(Movie.details))  # type: ignore[arg-type]
+        .execution_options(populate_existing=True)
+    )
+    return session.exec(stmt).first()
+
+
+def invalidate_popular_cache() -> None:
+    global POPULAR_VERSION
+    POPULAR_VERSION += 1
+    POPULAR_CACHE.clear()
+
+
+def encode_cursor(popularity: float, movie_id: int) -> str:
+    """Opaque keyset cursor pointing just past the given (popularity, id) position."""
+    return base64.urlsafe_b64encode(json.dumps([popularity, movie_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        popularity, movie_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(popularity), int(movie_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+
+
+def _cache_popular_page(
+    key: Tuple[int, Optional[MediaType], Optional[str]], now: float, response: PopularMoviesResponse
+) -> None:
+    # Entries are kept in the order they were stored, so expired ones (and, when full, the oldest) sit in front
+    POPULAR_CACHE.pop(key, None)
+    while POPULAR_CACHE:
+        oldest_key, (stored_at, _) = next(iter(POPULAR_CACHE.items()))
+        if now - stored_at < POPULAR_CACHE_TTL_SECONDS and len(POPULAR_CACHE) < POPULAR_CACHE_MAX_ENTRIES:
+            break
+        del POPULAR_CACHE[oldest_key]
+    POPULAR_CACHE[key] = (now, response)
+
+
+def _load_popular_movies(page: int, media_type: Optional[MediaType], cursor: Optional[str]) -> PopularMoviesResponse:
+    query = select(Movie).where(col(Movie.is_popular))
+    count_query = select(func.count(col(Movie.id))).where(col(Movie.is_popular))
+    if media_type is not None:
+        query = query.where(Movie.media_type == media_type)
+        count_query = count_query.where(Movie.media_type == media_type)
+
+    if cursor is not None:
+        # Seek straight past the previous page instead of scanning and discarding OFFSET rows
+        query = query.where(tuple_(Movie.popularity, Movie.id) < tuple_(*decode_cursor(cursor)))
+    elif page > 1:
+        query = query.offset((page - 1) * POPULAR_PAGE_SIZE)
+
+    with get_session() as session:
+        result = session.exec(count_query).first()
+        total_results = result if result is not None else 0
+        # One extra row tells whether another page follows
+        movies = list(
+            session.exec(query.order_by(desc(Movie.popularity), desc(Movie.id)).limit(POPULAR_PAGE_SIZE + 1)).all()
+        )
+
+        next_cursor = None
+        if len(movies) > POPULAR_PAGE_SIZE:
+            movies = movies[:POPULAR_PAGE_SIZE]
+            last = movies[-1]
+            if last.id is not None:
+                next_cursor = encode_cursor(last.popularity, last.id)
+
+        return PopularMoviesResponse(
+            movies=[movie.model_dump(mode="json") for movie in movies],
+            page=page,
+            total_pages=max(1, -(-total_results // POPULAR_PAGE_SIZE)),
+            total_results=total_results,
+            next_cursor=next_cursor,
+        )
+
+
+@max_queries(2)
+def get_popular_movies(
+    page: int = 1, media_type: Optional[MediaType] = None, cursor: Optional[str] = None
+) -> PopularMoviesResponse:
+    """Popular movies page, served from a short-lived in-process cache.
+
+    Pages are walked with the next_cursor of the previous response (keyset pagination); page only
+    labels the response, and falls back to OFFSET paging when no cursor is given. Entries expire
+    after POPULAR_CACHE_TTL_SECONDS, at most POPULAR_CACHE_MAX_ENTRIES are kept, and all are dropped
+    whenever a catalog refresh through bulk_upsert_movies() is committed.
+    """
+    key = (page, media_type, cursor)
+    now = time.monotonic()
+    cached = POPULAR_CACHE.get(key)
+    if cached is not None and now - cached[0] < POPULAR_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    version = POPULAR_VERSION
+    response = _load_popular_movies(page, media_type, cursor)
+    if version == POPULAR_VERSION:
+        _cache_popular_page(key, now, response)
+    return response
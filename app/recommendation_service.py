@@ -0,0 +1,161 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Type, Union, cast
+
+from sqlalchemy import ColumnElement, CursorResult
+from sqlmodel import Session, col, desc, func, select, union_all, update
+
+from app.database import dialect_insert, max_queries
+from app.feature_vectors import dot, pack_vector
+from app.models import (
+    GuestSession,
+    MovieFeatureVector,
+    MovieGenre,
+    MovieKeyword,
+    PreferenceType,
+    User,
+    UserPreference,
+    UserPreferenceCreate,
+    check_single_owner,
+    owner_filter,
+)
+
+# Upper bound on candidates handed to the ranker, keeping every candidate query bounded
+CANDIDATE_LIMIT = 200
+
+
+@max_queries(1)
+def find_candidate_movie_ids(
+    session: Session,
+    keywords: Sequence[str] = (),
+    genre_ids: Sequence[int] = (),
+    limit: int = CANDIDATE_LIMIT,
+) -> List[int]:
+    """Movies tagged with any of the given keywords or genres, most overlapping first.
+
+    Served from the movie_keywords / movie_genres indexes, so the cost grows with the number of
+    matches rather than with the size of the catalog.
+    """
+    matches = []
+    if keywords:
+        matches.append(select(MovieKeyword.movie_id).where(col(MovieKeyword.keyword).in_(keywords)))
+    if genre_ids:
+        matches.append(select(MovieGenre.movie_id).where(col(MovieGenre.genre_id).in_(genre_ids)))
+    if not matches:
+        return []
+
+    tagged = union_all(*matches).subquery()
+    stmt = (
+        select(tagged.c.movie_id)
+        .group_by(tagged.c.movie_id)
+        .order_by(desc(func.count()), tagged.c.movie_id)
+        .limit(limit)
+    )
+    return list(session.exec(stmt).all())
+
+
+def _owner_model(
+    user_id: Optional[int], guest_session_id: Optional[int]
+) -> Tuple[Union[Type[User], Type[GuestSession]], ColumnElement[bool]]:
+    # The preference vector is read and written as a bare column: loading the User or GuestSession
+    # entity would pull in its eagerly loaded history, lists, preferences and recommendations
+    if user_id is not None:
+        return User, col(User.id) == user_id
+    return GuestSession, col(GuestSession.id) == guest_session_id
+
+
+def invalidate_preference_vector(
+    session: Session, user_id: Optional[int] = None, guest_session_id: Optional[int] = None
+) -> None:
+    """Drop the stored preference vector of a user or guest session; it is rebuilt on next use."""
+    model, is_owner = _owner_model(user_id, guest_session_id)
+    session.execute(update(model).where(is_owner).values(preference_vector=None))
+
+
+@max_queries(2)
+def record_preferences(
+    session: Session,
+    preferences: Sequence[UserPreferenceCreate],
+    user_id: Optional[int] = None,
+    guest_session_id: Optional[int] = None,
+) -> int:
+    """Add preference weights for a user or guest session in one upsert.
+
+    A preference the owner already has gets the new weight added to its current one. The caller
+    commits. Returns the number of distinct preferences written.
+    """
+    check_single_owner(user_id, guest_session_id)
+
+    # Merge repeats first: a single INSERT ... ON CONFLICT may not touch the same row twice
+    merged: Dict[Tuple[PreferenceType, str], dict] = {}
+    for preference in preferences:
+        key = (preference.preference_type, preference.preference_value)
+        if key in merged:
+            merged[key]["weight"] += preference.weight
+        else:
+            merged[key] = {"user_id": user_id, "guest_session_id": guest_session_id, **preference.model_dump()}
+    if not merged:
+        return 0
+
+    owner_column = "user_id" if user_id is not None else "guest_session_id"
+    stmt = dialect_insert(session, UserPreference)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[owner_column, "preference_type", "preference_value"],
+        set_={
+            "weight": UserPreference.weight + stmt.excluded.weight,
+            "source": stmt.excluded.source,
+            "source_movie_id": stmt.excluded.source_movie_id,
+            "updated_at": func.now(),
+        },
+    )
+    session.execute(stmt, list(merged.values()), execution_options={"render_nulls": True})
+    invalidate_preference_vector(session, user_id=user_id, guest_session_id=guest_session_id)
+    return len(merged)
+
+
+def refresh_preference_vector(
+    session: Session, user_id: Optional[int] = None, guest_session_id: Optional[int] = None
+) -> Optional[bytes]:
+    """Recompute and store the packed preference vector of a user or guest session from its
+    UserPreference rows. Returns None if the owner does not exist. The caller commits."""
+    preferences = session.exec(
+        select(UserPreference.preference_type, UserPreference.preference_value, UserPreference.weight).where(
+            owner_filter(UserPreference, user_id, guest_session_id)
+        )
+    ).all()
+
+    vector = pack_vector((PreferenceType(kind), value, weight) for kind, value, weight in preferences)
+    model, is_owner = _owner_model(user_id, guest_session_id)
+    stored = session.execute(update(model).where(is_owner).values(preference_vector=vector))
+    return vector if cast(CursorResult, stored).rowcount else None
+
+
+@max_queries(3)
+def get_preference_vector(
+    session: Session, user_id: Optional[int] = None, guest_session_id: Optional[int] = None
+) -> Optional[bytes]:
+    """Stored preference vector of a user or guest session, recomputed if it was invalidated."""
+    model, is_owner = _owner_model(user_id, guest_session_id)
+    owner = session.exec(select(model.id, model.preference_vector).where(is_owner)).first()
+    if owner is None:
+        return None
+    _, stored = owner
+    if stored is not None:
+        return stored
+    return refresh_preference_vector(session, user_id=user_id, guest_session_id=guest_session_id)
+
+
+@max_queries(1)
+def load_movie_vectors(session: Session, movie_ids: Sequence[int]) -> List[Tuple[int, bytes]]:
+    """(movie_id, feature vector) rows for the given movies, read as bare columns without loading Movie rows.
+    Movies that have no vector yet are left out."""
+    if not movie_ids:
+        return []
+    stmt = select(MovieFeatureVector.movie_id, MovieFeatureVector.feature_vector).where(
+        col(MovieFeatureVector.movie_id).in_(movie_ids)
+    )
+    return [(movie_id, vector) for movie_id, vector in session.exec(stmt)]
+
+
+def rank_movies(preference_vector: bytes, vectors: Sequence[Tuple[int, bytes]]) -> List[Tuple[int, float]]:
+    """Order candidate (movie_id, feature vector) rows by their dot product with the preference vector."""
+    scored = [(movie_id, dot(preference_vector, vector)) for movie_id, vector in vectors]
+    return sorted(scored, key=lambda pair: pair[1], reverse=True)
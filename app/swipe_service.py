@@ -0,0 +1,269 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, bindparam, col, desc, func, or_, update
+
+from app.database import dialect_insert, get_session, max_queries
+from app.models import (
+    HistoryBatchCreate,
+    Movie,
+    Recommendation,
+    SwipeCard,
+    SwipeSession,
+    UserAction,
+    ViewingHistory,
+    ViewingHistoryCreate,
+    WatchingListItem,
+    WatchingListItemCreate,
+    check_single_owner,
+    owner_filter,
+)
+from app.recommendation_service import invalidate_preference_vector
+
+logger = getLogger(__name__)
+
+# A buffered session is written once it holds this many swipes, or once its oldest swipe is this old
+SWIPE_FLUSH_SIZE = 25
+SWIPE_FLUSH_INTERVAL_SECONDS = 2.0
+# A buffer whose write keeps failing is retried on later flushes, then dropped (and logged) after this many tries
+SWIPE_MAX_WRITE_ATTEMPTS = 3
+
+# Cards handed to the swipe UI per request, and how much of the overview each card carries
+SWIPE_FEED_SIZE = 20
+SWIPE_CARD_OVERVIEW_LENGTH = 200
+
+# (user_id, guest_session_id); exactly one of the two is set
+Owner = Tuple[Optional[int], Optional[int]]
+
+
+@dataclass
+class _PendingSwipes:
+    started_at: float
+    items: List[ViewingHistoryCreate] = field(default_factory=list)
+    actions: Dict[int, UserAction] = field(default_factory=dict)
+    attempts: int = 0
+
+
+_PENDING: Dict[Owner, _PendingSwipes] = {}
+_PENDING_LOCK = threading.Lock()
+
+
+@max_queries(1)
+def get_swipe_cards(
+    session: Session,
+    user_id: Optional[int] = None,
+    guest_session_id: Optional[int] = None,
+    limit: int = SWIPE_FEED_SIZE,
+) -> List[SwipeCard]:
+    """Best-scored pending (not yet shown, unexpired) recommendations of a user or guest session.
+
+    Selects only the columns a card shows, so no ORM objects, relationships or JSON detail
+    columns are loaded.
+    """
+    check_single_owner(user_id, guest_session_id)
+
+    stmt = (
+        select(
+            col(Recommendation.id).label("recommendation_id"),
+            col(Recommendation.movie_id),
+            col(Movie.title),
+            col(Movie.poster_path),
+            func.substr(Movie.overview, 1, SWIPE_CARD_OVERVIEW_LENGTH).label("overview"),
+            col(Recommendation.score),
+            col(Recommendation.reason),
+        )
+        .join(Movie, col(Movie.id) == Recommendation.movie_id)
+        .where(
+            owner_filter(Recommendation, user_id, guest_session_id),
+            col(Recommendation.shown_at).is_(None),
+            or_(col(Recommendation.expires_at).is_(None), col(Recommendation.expires_at) > func.now()),
+        )
+        .order_by(desc(Recommendation.score), desc(Recommendation.id))
+        .limit(limit)
+    )
+    return [SwipeCard(**row._mapping) for row in session.execute(stmt)]
+
+
+@max_queries(3)
+def insert_history_batch(session: Session, batch: HistoryBatchCreate) -> int:
+    """Write a batch of swipes: one multi-row upsert for the history and one executemany UPDATE
+    for the recommendation outcomes. The caller commits. Returns the number of history rows.
+
+    Swiping a title again replaces the owner's earlier reaction to it; within a batch the last
+    swipe per title wins, since a single INSERT ... ON CONFLICT may not touch the same row twice.
+    """
+    latest = {item.movie_id: item for item in batch.items}
+    rows = [
+        {"user_id": batch.user_id, "guest_session_id": batch.guest_session_id, **item.model_dump()}
+        for item in latest.values()
+    ]
+    if rows:
+        owner_column = "user_id" if batch.user_id is not None else "guest_session_id"
+        stmt = dialect_insert(session, ViewingHistory)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[owner_column, "movie_id"],
+            set_={
+                "liked": stmt.excluded.liked,
+                "rating": stmt.excluded.rating,
+                "notes": stmt.excluded.notes,
+                "watched_at": func.now(),
+            },
+        )
+        # Send missing rating/notes as NULL so every row shares one statement instead of batching by key set
+        session.execute(stmt, rows, execution_options={"render_nulls": True})
+        # New reactions make the stored taste vector stale
+        invalidate_preference_vector(session, user_id=batch.user_id, guest_session_id=batch.guest_session_id)
+
+    if batch.recommendation_actions:
+        # Only touch recommendations that belong to the batch owner. A swiped card counts as shown,
+        # which takes it out of the pending swipe feed
+        stmt = (
+            update(Recommendation)
+            .where(
+                col(Recommendation.id) == bindparam("recommendation_id"),
+                owner_filter(Recommendation, batch.user_id, batch.guest_session_id),
+            )
+            .values(
+                user_action=bindparam("action"),
+                user_action_at=func.now(),
+                shown_at=func.coalesce(Recommendation.shown_at, func.now()),
+            )
+            .execution_options(dml_strategy="core_only")
+        )
+        params = [
+            {"recommendation_id": recommendation_id, "action": action}
+            for recommendation_id, action in batch.recommendation_actions.items()
+        ]
+        session.execute(stmt, params)
+
+    return len(rows)
+
+
+@max_queries(1)
+def add_to_watching_list(session: Session, item: WatchingListItemCreate) -> bool:
+    """Add a title to a watching list in one statement. Returns False if it was already on the list.
+    The caller commits."""
+    stmt = (
+        dialect_insert(session, WatchingListItem)
+        .values(**item.model_dump())
+        .on_conflict_do_nothing(index_elements=["watching_list_id", "movie_id"])
+        .returning(col(WatchingListItem.id))
+    )
+    return session.execute(stmt).first() is not None
+
+
+def _requeue(owner: Owner, pending: _PendingSwipes) -> None:
+    """Put a buffer whose write failed back in front of anything the owner swiped meanwhile."""
+    pending.attempts += 1
+    if pending.attempts >= SWIPE_MAX_WRITE_ATTEMPTS:
+        logger.error(
+            "Dropping %d buffered swipes of owner %s after %d failed writes",
+            len(pending.items),
+            owner,
+            pending.attempts,
+        )
+        return
+    with _PENDING_LOCK:
+        newer = _PENDING.get(owner)
+        if newer is not None:
+            pending.items.extend(newer.items)
+            pending.actions.update(newer.actions)
+        _PENDING[owner] = pending
+
+
+def _write(owner: Owner, pending: _PendingSwipes) -> int:
+    """Write one owner's buffer. A database error is logged and the buffer requeued, so one failing
+    owner neither loses its swipes nor stops a flush from writing everyone else's. Returns rows written."""
+    batch = HistoryBatchCreate(
+        user_id=owner[0], guest_session_id=owner[1], items=pending.items, recommendation_actions=pending.actions
+    )
+    try:
+        with get_session() as session:
+            written = insert_history_batch(session, batch)
+            session.commit()
+    except SQLAlchemyError:
+        logger.exception("Writing %d buffered swipes of owner %s failed", len(pending.items), owner)
+        _requeue(owner, pending)
+        return 0
+    return written
+
+
+def queue_swipe(
+    item: ViewingHistoryCreate,
+    user_id: Optional[int] = None,
+    guest_session_id: Optional[int] = None,
+    recommendation_id: Optional[int] = None,
+    action: Optional[UserAction] = None,
+) -> int:
+    """Buffer one swipe in memory instead of writing it immediately.
+
+    The owner's buffer is written here once it reaches SWIPE_FLUSH_SIZE swipes, or by this owner's next
+    swipe once it is SWIPE_FLUSH_INTERVAL_SECONDS old. Buffers of owners who stopped swiping are written
+    by flush_stale_swipes() (run on a timer) and by end_swipe_session(). Returns the number of history
+    rows written by this call (0 if the swipe was only buffered).
+    """
+    check_single_owner(user_id, guest_session_id)
+
+    owner = (user_id, guest_session_id)
+    now = time.monotonic()
+    with _PENDING_LOCK:
+        pending = _PENDING.setdefault(owner, _PendingSwipes(started_at=now))
+        pending.items.append(item)
+        if recommendation_id is not None and action is not None:
+            pending.actions[recommendation_id] = action
+
+        due = len(pending.items) >= SWIPE_FLUSH_SIZE or now - pending.started_at >= SWIPE_FLUSH_INTERVAL_SECONDS
+        if not due:
+            return 0
+        del _PENDING[owner]
+
+    return _write(owner, pending)
+
+
+def flush_swipes(user_id: Optional[int] = None, guest_session_id: Optional[int] = None) -> int:
+    """Write whatever is buffered for one owner, e.g. when their swipe session ends."""
+    owner = (user_id, guest_session_id)
+    with _PENDING_LOCK:
+        pending = _PENDING.pop(owner, None)
+    if pending is None:
+        return 0
+    return _write(owner, pending)
+
+
+def flush_stale_swipes(max_age_seconds: float = SWIPE_FLUSH_INTERVAL_SECONDS) -> int:
+    """Write every buffer whose oldest swipe is at least max_age_seconds old. Run periodically, so the
+    last few swipes of an owner who stopped swiping do not wait in memory until shutdown."""
+    now = time.monotonic()
+    with _PENDING_LOCK:
+        stale = [(owner, pending) for owner, pending in _PENDING.items() if now - pending.started_at >= max_age_seconds]
+        for owner, _ in stale:
+            del _PENDING[owner]
+    return sum(_write(owner, pending) for owner, pending in stale)
+
+
+def end_swipe_session(swipe_session_id: int) -> Optional[SwipeSession]:
+    """Write the owner's buffered swipes and stamp the swipe session as ended."""
+    with get_session() as session:
+        swipe_session = session.get(SwipeSession, swipe_session_id)
+        if swipe_session is None:
+            return None
+        flush_swipes(user_id=swipe_session.user_id, guest_session_id=swipe_session.guest_session_id)
+        if swipe_session.ended_at is None:
+            swipe_session.ended_at = datetime.now(timezone.utc)
+            session.commit()
+            session.refresh(swipe_session)
+        return swipe_session
+
+
+def flush_all_swipes() -> int:
+    """Write every buffered swipe, e.g. on shutdown."""
+    with _PENDING_LOCK:
+        pending_by_owner = list(_PENDING.items())
+        _PENDING.clear()
+    return sum(_write(owner, pending) for owner, pending in pending_by_owner)
@@ -1,7 +1,8 @@
 import logging
 import os
 from app.startup import startup
-from nicegui import app, ui
+from app.swipe_service import SWIPE_FLUSH_INTERVAL_SECONDS, flush_all_swipes, flush_stale_swipes
+from nicegui import app, run, ui
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -30,6 +31,10 @@ async def health():
 logging.getLogger("sqlalchemy.engine.Engine").setLevel(logging.WARNING)
 
 app.on_startup(startup)
+# write buffered swipes of owners who stopped swiping (in a worker thread, off the event loop),
+# and everything still buffered before the process exits
+app.timer(SWIPE_FLUSH_INTERVAL_SECONDS, lambda: run.io_bound(flush_stale_swipes), immediate=False)
+app.on_shutdown(flush_all_swipes)
 
 # Add security headers middleware
 app.add_middleware(SecurityHeadersMiddleware)
@@ -1,12 +1,34 @@
+import os
 from typing import Generator
 import pytest
+from app.database import count_queries as _count_queries, reset_db
 from app.startup import startup
 from nicegui.testing import User
 
 pytest_plugins = ["nicegui.testing.plugin"]
 
 
+@pytest.fixture(autouse=True, scope="session")
+def strict_query_budgets() -> None:
+    """Make app.database.max_queries raise instead of log when a budget is exceeded"""
+    os.environ.setdefault("APP_DEBUG", "1")
+
+
 @pytest.fixture
 def user(user: User) -> Generator[User, None, None]:
     startup()
     yield user
+
+
+@pytest.fixture()
+def clean_db() -> Generator[None, None, None]:
+    """Reset database for each test"""
+    reset_db()
+    yield
+    reset_db()
+
+
+@pytest.fixture()
+def count_queries():
+    """Context manager collecting the SQL statements executed inside it"""
+    return _count_queries
@@ -0,0 +1,28 @@
+import pytest
+from sqlmodel import select, text
+
+from app.database import QueryBudgetExceeded, get_session, max_queries
+from app.models import Movie
+
+
+@max_queries(1)
+def _count_movies_twice() -> int:
+    with get_session() as session:
+        session.exec(select(Movie)).all()
+        return len(session.exec(select(Movie)).all())
+
+
+def test_count_queries_includes_nested_blocks(clean_db, count_queries):
+    with get_session() as session:
+        with count_queries() as outer:
+            session.execute(text("SELECT 1"))
+            with count_queries() as inner:
+                session.execute(text("SELECT 2"))
+
+    assert inner == ["SELECT 2"]
+    assert outer == ["SELECT 1", "SELECT 2"]
+
+
+def test_max_queries_raises_over_budget(clean_db):
+    with pytest.raises(QueryBudgetExceeded, match="executed 2 queries, budget is 1"):
+        _count_movies_twice()
@@ -0,0 +1,27 @@
+from app.database import get_session
+from app.guest_session_service import create_guest_session, get_guest_session_by_token, hash_session_token
+from app.models import GuestSessionCreate
+
+
+def test_hash_session_token_is_stable_signed_64_bit():
+    value = hash_session_token("token-123")
+
+    assert value == hash_session_token("token-123")
+    assert value != hash_session_token("token-124")
+    assert -(2**63) <= value < 2**63
+
+
+def test_lookup_by_token(clean_db, count_queries):
+    created = create_guest_session(GuestSessionCreate(session_token="guest-token", expires_in_days=7))
+
+    with get_session() as session:
+        with count_queries() as queries:
+            found = get_guest_session_by_token(session, "guest-token")
+        missing = get_guest_session_by_token(session, "other-token")
+
+    assert len(queries) == 1  # no eager loads of the session's history, lists or preferences
+
+    assert found is not None
+    assert found.id == created.id
+    assert found.session_token_hash == hash_session_token("guest-token")
+    assert missing is None
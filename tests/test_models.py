@@ -0,0 +1,132 @@
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import DateTime, SQLModel, select, text
+
+from app.database import get_session
+from app.models import (
+    OVERVIEW_MAX_LENGTH,
+    REASON_MAX_LENGTH,
+    MediaType,
+    Movie,
+    MovieUpdate,
+    RecommendationCreate,
+    SwipeAction,
+    SwipeActionKind,
+    UserCreate,
+    UserUpdate,
+)
+
+
+@pytest.mark.parametrize("email", ["alice@example.com", "first.last+tag@mail.example.co.uk"])
+def test_user_create_accepts_valid_email(email):
+    user = UserCreate(username="alice", email=email, password="secret-password", display_name="Alice")
+    assert user.email == email
+
+
+@pytest.mark.parametrize("email", ["alice", "alice@localhost", "alice@example..com", "alice@example.com."])
+def test_user_create_rejects_invalid_email(email):
+    with pytest.raises(ValidationError):
+        UserCreate(username="alice", email=email, password="secret-password", display_name="Alice")
+
+
+def test_user_update_email_optional():
+    assert UserUpdate(display_name="Alice").email is None
+
+    with pytest.raises(ValidationError):
+        UserUpdate(email="not-an-email")
+
+
+def test_schemas_are_frozen_and_reject_unknown_fields():
+    update = UserUpdate(display_name="  Alice  ")
+    assert update.display_name == "Alice"
+
+    with pytest.raises(ValidationError):
+        update.display_name = "Bob"
+
+    with pytest.raises(ValidationError):
+        UserUpdate.model_validate({"display_name": "Alice", "is_admin": True})
+
+
+def test_passwords_kept_verbatim():
+    user = UserCreate(username="alice", email="alice@example.com", password="  spaced  ", display_name="Alice")
+    assert user.password == "  spaced  "
+
+
+def test_swipe_action_rejects_unknown_action():
+    # Raw request payloads carry plain strings
+    assert SwipeAction.model_validate({"recommendation_id": 1, "action": "like"}).action is SwipeActionKind.LIKE
+
+    with pytest.raises(ValidationError):
+        SwipeAction.model_validate({"recommendation_id": 1, "action": "superlike"})
+
+
+def test_media_type_check_constraint(clean_db):
+    with get_session() as session:
+        session.add(Movie(tmdb_id=1, title="Show", original_title="Show", media_type=MediaType.TV))
+        session.commit()
+        movie = session.exec(select(Movie)).one()
+        assert movie.media_type is MediaType.TV
+
+    with get_session() as session:
+        with pytest.raises(IntegrityError):
+            session.execute(text("UPDATE movies SET media_type = 'podcast'"))
+
+
+def test_long_free_text_truncated_at_ingestion():
+    movie = MovieUpdate(
+        tmdb_id=1,
+        title="Movie",
+        original_title="Movie",
+        overview="x" * (OVERVIEW_MAX_LENGTH + 50),
+        vote_average=7.0,
+        vote_count=10,
+        popularity=1.0,
+        media_type=MediaType.MOVIE,
+    )
+    assert len(movie.overview) == OVERVIEW_MAX_LENGTH
+
+    recommendation = RecommendationCreate(
+        movie_id=1, score=0.5, reason="because " * 100, recommendation_type="similar_genre"
+    )
+    assert len(recommendation.reason) == REASON_MAX_LENGTH
+
+    assert SwipeAction(recommendation_id=1, action=SwipeActionKind.LIKE, notes="ok").notes == "ok"
+
+
+def test_column_storage(clean_db):
+    with get_session() as session:
+        if session.get_bind().dialect.name != "postgresql":
+            pytest.skip("column storage is PostgreSQL-specific")
+        rows = session.execute(
+            text(
+                "SELECT attrelid::regclass::text || '.' || attname, attstorage FROM pg_attribute "
+                "WHERE attrelid IN ('movies'::regclass, 'viewing_history'::regclass) "
+                "AND attname IN ('overview', 'notes')"
+            )
+        ).all()
+        storage = {column: kind for column, kind in rows}
+
+    assert storage == {"movies.overview": "x", "viewing_history.notes": "e"}
+
+
+def test_server_timestamps_optional_on_python_side(clean_db):
+    movie = Movie.model_validate({"tmdb_id": 1, "title": "Movie", "original_title": "Movie", "media_type": "movie"})
+    assert movie.created_at is None and movie.updated_at is None
+
+    with get_session() as session:
+        session.add(movie)
+        session.commit()
+        session.refresh(movie)
+
+    assert movie.created_at is not None and movie.updated_at is not None  # filled in by the database
+
+
+def test_every_timestamp_column_is_timezone_aware():
+    naive = [
+        f"{table.name}.{column.name}"
+        for table in SQLModel.metadata.tables.values()
+        for column in table.columns
+        if isinstance(column.type, DateTime) and not column.type.timezone
+    ]
+    assert naive == []
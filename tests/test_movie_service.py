@@ -0,0 +1,264 @@
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+from pydantic import ValidationError
+from sqlmodel import select
+
+from app.database import get_session
+from app.models import Movie, MovieBulkUpsert, MovieUpdate
+from app.movie_service import (
+    POPULAR_CACHE,
+    POPULAR_CACHE_MAX_ENTRIES,
+    POPULAR_PAGE_SIZE,
+    bulk_upsert_movies,
+    decode_cursor,
+    encode_cursor,
+    get_movie_with_details,
+    get_popular_movies,
+    invalidate_popular_cache,
+    parse_movie_batch,
+)
+
+
+def make_movie_update(tmdb_id: int, **overrides: Any) -> MovieUpdate:
+    data: dict[str, Any] = {
+        "tmdb_id": tmdb_id,
+        "title": f"Movie {tmdb_id}",
+        "original_title": f"Movie {tmdb_id}",
+        "release_date": "2020-05-01",
+        "vote_average": 7.5,
+        "vote_count": 100,
+        "popularity": 12.345,
+        "media_type": "movie",
+    }
+    data.update(overrides)
+    return MovieUpdate(**data)
+
+
+def test_bulk_upsert_inserts_new_movies(clean_db):
+    payload = MovieBulkUpsert(movies=[make_movie_update(tmdb_id) for tmdb_id in range(1, 6)])
+
+    with get_session() as session:
+        written = bulk_upsert_movies(session, payload)
+        session.commit()
+
+        movies = list(session.exec(select(Movie)).all())
+
+    assert written == 5
+    assert {movie.tmdb_id for movie in movies} == {1, 2, 3, 4, 5}
+    assert all(movie.release_date == datetime(2020, 5, 1, tzinfo=timezone.utc) for movie in movies)
+    assert all(not movie.is_popular for movie in movies)
+    assert all(movie.created_at is not None and movie.created_at.tzinfo is not None for movie in movies)
+
+
+def test_bulk_upsert_refreshes_existing_movies(clean_db):
+    with get_session() as session:
+        bulk_upsert_movies(session, MovieBulkUpsert(movies=[make_movie_update(1)]))
+        session.commit()
+        movie = session.exec(select(Movie).where(Movie.tmdb_id == 1)).first()
+        assert movie is not None
+        movie.is_popular = True
+        session.commit()
+
+    refreshed = make_movie_update(1, title="Renamed", release_date="", vote_count=250)
+    with get_session() as session:
+        bulk_upsert_movies(session, MovieBulkUpsert(movies=[refreshed]))
+        session.commit()
+        movies = list(session.exec(select(Movie)).all())
+
+    assert len(movies) == 1
+    assert movies[0].title == "Renamed"
+    assert movies[0].vote_count == 250
+    assert movies[0].release_date is None
+    assert movies[0].is_popular  # curated flag survives catalog refreshes
+    created_at, updated_at = movies[0].created_at, movies[0].updated_at
+    assert created_at is not None and updated_at is not None
+    assert updated_at > created_at
+
+
+def test_bulk_upsert_keeps_last_duplicate_in_batch(clean_db):
+    payload = MovieBulkUpsert(movies=[make_movie_update(7, title="First"), make_movie_update(7, title="Second")])
+
+    with get_session() as session:
+        written = bulk_upsert_movies(session, payload)
+        session.commit()
+        movies = list(session.exec(select(Movie)).all())
+
+    assert written == 1
+    assert [movie.title for movie in movies] == ["Second"]
+
+
+def test_bulk_upsert_stores_details_separately(clean_db, count_queries):
+    payload = MovieBulkUpsert(
+        movies=[make_movie_update(3, genres=[{"id": 28, "name": "Action"}], keywords=["heist", "los angeles"])]
+    )
+
+    with get_session() as session:
+        bulk_upsert_movies(session, payload)
+        session.commit()
+
+        movie = session.exec(select(Movie).where(Movie.tmdb_id == 3)).first()
+        assert movie is not None
+        assert movie.details is None  # never loaded implicitly
+        assert movie.id is not None
+        movie_id = movie.id
+
+    with get_session() as session:
+        with count_queries() as queries:
+            detailed = get_movie_with_details(session, movie_id)
+
+    assert len(queries) == 2  # movie, then its details
+
+    assert detailed is not None
+    assert detailed.details is not None
+    assert detailed.details.genres == [{"id": 28, "name": "Action"}]
+    assert detailed.details.keywords == ["heist", "los angeles"]
+
+
+def test_get_movie_with_details_missing_movie(clean_db):
+    with get_session() as session:
+        assert get_movie_with_details(session, 9999) is None
+
+
+def seed_popular_movies(count: int) -> None:
+    # Tagged, so every movie carries a non-zero feature vector
+    payload = MovieBulkUpsert(
+        movies=[
+            make_movie_update(
+                tmdb_id,
+                popularity=float(tmdb_id),
+                genres=[{"id": 18, "name": "Drama"}],
+                keywords=["space"],
+            )
+            for tmdb_id in range(1, count + 1)
+        ]
+    )
+    with get_session() as session:
+        bulk_upsert_movies(session, payload)
+        for movie in session.exec(select(Movie)).all():
+            movie.is_popular = True
+        session.commit()
+
+
+def test_popular_movies_pagination(clean_db, count_queries):
+    seed_popular_movies(POPULAR_PAGE_SIZE + 5)
+    invalidate_popular_cache()
+
+    with count_queries() as queries:
+        first = get_popular_movies(page=1)
+        assert len(queries) == 2  # total count, page rows
+        assert get_popular_movies(page=1) is first
+        assert len(queries) == 2  # served from cache
+    second = get_popular_movies(page=2)
+
+    assert first.total_results == POPULAR_PAGE_SIZE + 5
+    assert first.total_pages == 2
+    assert len(first.movies) == POPULAR_PAGE_SIZE
+    assert first.movies[0]["popularity"] == POPULAR_PAGE_SIZE + 5
+    assert len(second.movies) == 5
+    assert first.next_cursor is not None
+    assert second.next_cursor is None
+    assert "feature_vector" not in first.movies[0]
+
+
+def test_popular_movies_keyset_pages_match_offset_pages(clean_db):
+    seed_popular_movies(POPULAR_PAGE_SIZE * 2 + 3)
+    invalidate_popular_cache()
+
+    seen = []
+    cursor = None
+    for page in range(1, 4):
+        response = get_popular_movies(page=page, cursor=cursor)
+        assert response.movies == get_popular_movies(page=page).movies
+        seen.extend(movie["tmdb_id"] for movie in response.movies)
+        cursor = response.next_cursor
+
+    assert cursor is None
+    assert len(seen) == len(set(seen)) == POPULAR_PAGE_SIZE * 2 + 3
+
+
+def test_decode_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12.5, 42)) == (12.5, 42)
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_popular_movies_empty_catalog(clean_db):
+    invalidate_popular_cache()
+
+    response = get_popular_movies()
+
+    assert response.movies == []
+    assert response.total_pages == 1
+    assert response.total_results == 0
+
+
+def test_popular_movies_cached_until_catalog_refresh(clean_db):
+    seed_popular_movies(3)
+    invalidate_popular_cache()
+
+    first = get_popular_movies()
+    assert get_popular_movies() is first
+    assert (1, None, None) in POPULAR_CACHE
+
+    # A catalog refresh drops cached pages, so the new movie shows up immediately
+    with get_session() as session:
+        bulk_upsert_movies(session, MovieBulkUpsert(movies=[make_movie_update(99, popularity=500.0)]))
+        movie = session.exec(select(Movie).where(Movie.tmdb_id == 99)).first()
+        assert movie is not None
+        movie.is_popular = True
+        session.commit()
+
+    refreshed = get_popular_movies()
+    assert refreshed is not first
+    assert refreshed.movies[0]["tmdb_id"] == 99
+
+
+def test_popular_cache_dropped_only_when_refresh_commits(clean_db):
+    seed_popular_movies(3)
+    invalidate_popular_cache()
+    first = get_popular_movies()
+
+    with get_session() as session:
+        bulk_upsert_movies(session, MovieBulkUpsert(movies=[make_movie_update(99)]))
+        assert get_popular_movies() is first  # uncommitted refresh: readers keep the cached page
+        session.rollback()
+    assert get_popular_movies() is first  # rolled back: nothing changed
+
+    with get_session() as session:
+        bulk_upsert_movies(session, MovieBulkUpsert(movies=[make_movie_update(99)]))
+        session.commit()
+    assert POPULAR_CACHE == {}
+
+
+def test_popular_cache_is_bounded(clean_db):
+    invalidate_popular_cache()
+
+    for movie_id in range(POPULAR_CACHE_MAX_ENTRIES + 5):
+        get_popular_movies(cursor=encode_cursor(1.0, movie_id))
+
+    assert len(POPULAR_CACHE) == POPULAR_CACHE_MAX_ENTRIES
+    assert (1, None, encode_cursor(1.0, 0)) not in POPULAR_CACHE  # oldest evicted first
+    assert (1, None, encode_cursor(1.0, POPULAR_CACHE_MAX_ENTRIES + 4)) in POPULAR_CACHE
+
+
+def test_parse_movie_batch_validates_raw_payloads():
+    payload = parse_movie_batch([make_movie_update(1).model_dump(), make_movie_update(2).model_dump()])
+
+    assert [movie.tmdb_id for movie in payload.movies] == [1, 2]
+    assert all(isinstance(movie, MovieUpdate) for movie in payload.movies)
+
+
+@pytest.mark.parametrize("overrides", [{"release_date": "2020-13-45"}, {"keywords": ["x" * 256]}])
+def test_parse_movie_batch_rejects_rows_the_upsert_cannot_store(overrides):
+    raw = make_movie_update(1).model_dump()
+    raw.update(overrides)
+
+    with pytest.raises(ValidationError):
+        parse_movie_batch([make_movie_update(2).model_dump(), raw])
+
+
+def test_empty_tmdb_date_normalised_to_none():
+    assert make_movie_update(1, release_date="", first_air_date="").release_date is None
@@ -0,0 +1,183 @@
+from typing import Dict
+
+from sqlmodel import select
+
+from app.database import get_session
+from app.models import (
+    MediaType,
+    Movie,
+    MovieBulkUpsert,
+    MovieKeyword,
+    MovieUpdate,
+    PreferenceSource,
+    PreferenceType,
+    User,
+    UserPreference,
+    UserPreferenceCreate,
+)
+from app.movie_service import bulk_upsert_movies
+from app.recommendation_service import (
+    find_candidate_movie_ids,
+    get_preference_vector,
+    load_movie_vectors,
+    rank_movies,
+    record_preferences,
+)
+
+
+def seed_movies(session, tagged: Dict[int, dict]) -> Dict[int, int]:
+    """Upsert movies keyed by tmdb_id and return a tmdb_id -> movie.id map."""
+    movies = [
+        MovieUpdate(
+            tmdb_id=tmdb_id,
+            title=f"Movie {tmdb_id}",
+            original_title=f"Movie {tmdb_id}",
+            vote_average=7.0,
+            vote_count=10,
+            popularity=1.0,
+            media_type=MediaType.MOVIE,
+            **tags,
+        )
+        for tmdb_id, tags in tagged.items()
+    ]
+    bulk_upsert_movies(session, MovieBulkUpsert(movies=movies))
+    session.commit()
+    return {movie.tmdb_id: movie.id for movie in session.exec(select(Movie)).all() if movie.id is not None}
+
+
+def test_candidates_ranked_by_overlap(clean_db):
+    with get_session() as session:
+        ids = seed_movies(
+            session,
+            {
+                1: {"keywords": ["heist"], "genres": [{"id": 80, "name": "Crime"}]},
+                2: {"keywords": ["heist", "space"], "genres": [{"id": 878, "name": "Science Fiction"}]},
+                3: {"keywords": ["romance"], "genres": [{"id": 10749, "name": "Romance"}]},
+            },
+        )
+
+        candidates = find_candidate_movie_ids(session, keywords=["heist", "space"], genre_ids=[80])
+
+    assert candidates[0] in (ids[1], ids[2])
+    assert set(candidates) == {ids[1], ids[2]}
+    assert ids[3] not in candidates
+
+
+def test_candidates_single_query_from_fresh_session(clean_db, count_queries):
+    with get_session() as session:
+        ids = seed_movies(session, {1: {"keywords": ["heist"], "genres": [{"id": 80, "name": "Crime"}]}})
+
+    with get_session() as session:
+        with count_queries() as queries:
+            assert find_candidate_movie_ids(session, keywords=["heist"], genre_ids=[80]) == [ids[1]]
+
+    assert len(queries) == 1
+
+
+def test_candidates_without_criteria(clean_db):
+    with get_session() as session:
+        assert find_candidate_movie_ids(session) == []
+
+
+def test_candidates_respect_limit(clean_db):
+    with get_session() as session:
+        seed_movies(session, {tmdb_id: {"keywords": ["heist"]} for tmdb_id in range(1, 11)})
+
+        assert len(find_candidate_movie_ids(session, keywords=["heist"], limit=3)) == 3
+
+
+def test_refresh_replaces_stale_keywords(clean_db):
+    with get_session() as session:
+        ids = seed_movies(session, {1: {"keywords": ["heist", "heist", "noir"]}})
+        seed_movies(session, {1: {"keywords": ["space"]}})
+
+        keywords = list(session.exec(select(MovieKeyword.keyword).where(MovieKeyword.movie_id == ids[1])).all())
+
+    assert keywords == ["space"]
+
+
+def test_rank_movies_by_preference_vector(clean_db, count_queries):
+    with get_session() as session:
+        ids = seed_movies(
+            session,
+            {
+                1: {"keywords": ["heist"], "genres": [{"id": 80, "name": "Crime"}]},
+                2: {"keywords": ["romance"], "genres": [{"id": 10749, "name": "Romance"}]},
+            },
+        )
+        user = User(username="alice", email="alice@example.com", password_hash="x", display_name="Alice")
+        session.add(user)
+        session.commit()
+        assert user.id is not None
+        session.add_all(
+            [
+                UserPreference(
+                    user_id=user.id,
+                    preference_type=PreferenceType.GENRE,
+                    preference_value="Crime",
+                    weight=2.0,
+                    source=PreferenceSource.LIKED_MOVIE,
+                ),
+                UserPreference(
+                    user_id=user.id,
+                    preference_type=PreferenceType.KEYWORD,
+                    preference_value="romance",
+                    weight=-1.0,
+                    source=PreferenceSource.DISLIKED_MOVIE,
+                ),
+            ]
+        )
+        session.commit()
+        user_id = user.id
+
+    # Fresh sessions: the owner is not in the identity map, so nothing is served from memory
+    with get_session() as session:
+        with count_queries() as queries:
+            vector = get_preference_vector(session, user_id=user_id)
+        session.commit()
+    assert len(queries) == 3  # vector read, preference rows, stored rebuild
+    assert vector is not None
+
+    with get_session() as session:
+        with count_queries() as queries:
+            assert get_preference_vector(session, user_id=user_id) == vector
+        assert len(queries) == 1  # stored vector read back as a single column
+
+        with count_queries() as queries:
+            vectors = load_movie_vectors(session, [ids[2], ids[1]])
+        assert len(queries) == 1
+        ranked = rank_movies(vector, vectors)
+
+    assert [movie_id for movie_id, _ in ranked] == [ids[1], ids[2]]
+    assert ranked[0][1] > 0 > ranked[1][1]
+
+
+def test_preference_vector_for_unknown_owner(clean_db):
+    with get_session() as session:
+        assert get_preference_vector(session, user_id=9999) is None
+        assert get_preference_vector(session) is None
+
+
+def test_record_preferences_accumulates_weight(clean_db, count_queries):
+    crime = UserPreferenceCreate(
+        preference_type=PreferenceType.GENRE, preference_value="Crime", weight=1.0, source=PreferenceSource.LIKED_MOVIE
+    )
+    with get_session() as session:
+        user = User(username="alice", email="alice@example.com", password_hash="x", display_name="Alice")
+        session.add(user)
+        session.commit()
+        assert user.id is not None
+
+        user_id = user.id
+
+    with get_session() as session:
+        assert record_preferences(session, [crime, crime], user_id=user_id) == 1
+        with count_queries() as queries:
+            assert record_preferences(session, [crime], user_id=user_id) == 1
+        session.commit()
+
+        preference = session.exec(select(UserPreference)).one()
+
+    assert len(queries) == 2  # upsert, vector invalidation
+
+    assert preference.weight == 3.0
@@ -0,0 +1,348 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+from sqlmodel import select
+
+from app import swipe_service
+from app.database import get_session
+from app.models import (
+    HistoryBatchCreate,
+    MediaType,
+    Movie,
+    Recommendation,
+    SwipeSession,
+    User,
+    UserAction,
+    ViewingHistory,
+    ViewingHistoryCreate,
+    WatchingList,
+    WatchingListItem,
+    WatchingListItemCreate,
+)
+from app.swipe_service import (
+    SWIPE_CARD_OVERVIEW_LENGTH,
+    SWIPE_FLUSH_SIZE,
+    SWIPE_MAX_WRITE_ATTEMPTS,
+    add_to_watching_list,
+    end_swipe_session,
+    flush_stale_swipes,
+    flush_swipes,
+    get_swipe_cards,
+    insert_history_batch,
+    queue_swipe,
+)
+
+
+@pytest.fixture()
+def swipe_data(clean_db):
+    with get_session() as session:
+        user = User(username="alice", email="alice@example.com", password_hash="x", display_name="Alice")
+        other = User(username="bob", email="bob@example.com", password_hash="x", display_name="Bob")
+        movies = [
+            Movie(
+                tmdb_id=tmdb_id, title=f"Movie {tmdb_id}", original_title=f"Movie {tmdb_id}", media_type=MediaType.MOVIE
+            )
+            for tmdb_id in range(1, SWIPE_FLUSH_SIZE + 1)
+        ]
+        session.add_all([user, other, *movies])
+        session.commit()
+        assert user.id is not None and other.id is not None
+        movie_ids = [movie.id for movie in movies if movie.id is not None]
+
+        recommendations = [
+            Recommendation(
+                user_id=user.id,
+                movie_id=movie_ids[0],
+                score=0.9,
+                reason="Because you liked heists",
+                recommendation_type="similar_genre",
+                expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+            ),
+            Recommendation(
+                user_id=other.id, movie_id=movie_ids[1], score=0.8, reason="Popular", recommendation_type="popular"
+            ),
+        ]
+        session.add_all(recommendations)
+        session.commit()
+
+        yield {
+            "user_id": user.id,
+            "other_id": other.id,
+            "movie_ids": movie_ids,
+            "recommendation_ids": [recommendation.id for recommendation in recommendations],
+        }
+
+    swipe_service._PENDING.clear()
+
+
+def test_insert_history_batch_writes_history_and_outcomes(swipe_data):
+    own_rec, other_rec = swipe_data["recommendation_ids"]
+    batch = HistoryBatchCreate(
+        user_id=swipe_data["user_id"],
+        items=[
+            ViewingHistoryCreate(movie_id=swipe_data["movie_ids"][0], liked=True),
+            ViewingHistoryCreate(movie_id=swipe_data["movie_ids"][1], liked=False, rating=3),
+        ],
+        recommendation_actions={own_rec: UserAction.LIKED, other_rec: UserAction.DISLIKED},
+    )
+
+    with get_session() as session:
+        assert insert_history_batch(session, batch) == 2
+        session.commit()
+
+        history = list(session.exec(select(ViewingHistory)).all())
+        own = session.get(Recommendation, own_rec)
+        other = session.get(Recommendation, other_rec)
+
+    assert {(entry.movie_id, entry.liked) for entry in history} == {
+        (swipe_data["movie_ids"][0], True),
+        (swipe_data["movie_ids"][1], False),
+    }
+    assert all(entry.user_id == swipe_data["user_id"] and entry.watched_at is not None for entry in history)
+    assert own is not None and own.user_action == UserAction.LIKED and own.user_action_at is not None
+    assert own.shown_at is not None
+    assert other is not None and other.user_action is None and other.shown_at is None  # belongs to another user
+
+
+def test_insert_history_batch_invalidates_preference_vector(swipe_data):
+    user_id = swipe_data["user_id"]
+    with get_session() as session:
+        user = session.get(User, user_id)
+        assert user is not None
+        user.preference_vector = b"\x00" * 8
+        session.commit()
+
+        insert_history_batch(
+            session,
+            HistoryBatchCreate(
+                user_id=user_id, items=[ViewingHistoryCreate(movie_id=swipe_data["movie_ids"][0], liked=True)]
+            ),
+        )
+        session.commit()
+        session.refresh(user)
+
+        assert user.preference_vector is None
+
+
+def test_insert_history_batch_replaces_earlier_reaction(swipe_data):
+    user_id = swipe_data["user_id"]
+    movie_id = swipe_data["movie_ids"][0]
+    with get_session() as session:
+        insert_history_batch(
+            session, HistoryBatchCreate(user_id=user_id, items=[ViewingHistoryCreate(movie_id=movie_id, liked=True)])
+        )
+        session.commit()
+
+        written = insert_history_batch(
+            session,
+            HistoryBatchCreate(
+                user_id=user_id,
+                items=[
+                    ViewingHistoryCreate(movie_id=movie_id, liked=True, rating=9),
+                    ViewingHistoryCreate(movie_id=movie_id, liked=False, rating=2, notes="Changed my mind"),
+                ],
+            ),
+        )
+        session.commit()
+
+        history = session.exec(select(ViewingHistory)).one()
+
+    assert written == 1
+    assert (history.liked, history.rating, history.notes) == (False, 2, "Changed my mind")
+
+
+def test_add_to_watching_list_skips_duplicates(swipe_data):
+    with get_session() as session:
+        watching_list = WatchingList(user_id=swipe_data["user_id"], name="Watch Later")
+        session.add(watching_list)
+        session.commit()
+        assert watching_list.id is not None
+
+        item = WatchingListItemCreate(watching_list_id=watching_list.id, movie_id=swipe_data["movie_ids"][0])
+        assert add_to_watching_list(session, item) is True
+        assert add_to_watching_list(session, item) is False
+        session.commit()
+
+        assert len(session.exec(select(WatchingListItem)).all()) == 1
+
+
+def test_get_swipe_cards_returns_pending_projection(swipe_data, count_queries):
+    user_id = swipe_data["user_id"]
+    movie_ids = swipe_data["movie_ids"]
+    with get_session() as session:
+        movie = session.get(Movie, movie_ids[2])
+        assert movie is not None
+        movie.overview = "A long plot summary. " * 20
+        session.add_all(
+            [
+                movie,
+                Recommendation(
+                    user_id=user_id, movie_id=movie_ids[2], score=0.95, reason="Top pick", recommendation_type="ai"
+                ),
+                Recommendation(
+                    user_id=user_id,
+                    movie_id=movie_ids[3],
+                    score=0.99,
+                    reason="Already shown",
+                    recommendation_type="ai",
+                    shown_at=datetime.now(timezone.utc),
+                ),
+                Recommendation(
+                    user_id=user_id,
+                    movie_id=movie_ids[4],
+                    score=0.97,
+                    reason="Stale",
+                    recommendation_type="ai",
+                    expires_at=datetime.now(timezone.utc) - timedelta(days=1),
+                ),
+            ]
+        )
+        session.commit()
+
+    with get_session() as session:
+        with count_queries() as queries:
+            cards = get_swipe_cards(session, user_id=user_id)
+
+    assert len(queries) == 1
+
+    assert [(card.movie_id, card.reason) for card in cards] == [
+        (movie_ids[2], "Top pick"),
+        (movie_ids[0], "Because you liked heists"),
+    ]
+    assert len(cards[0].overview) == SWIPE_CARD_OVERVIEW_LENGTH
+    assert cards[1].title == "Movie 1" and cards[1].overview == ""
+
+
+def test_swiped_card_leaves_the_feed(swipe_data):
+    user_id = swipe_data["user_id"]
+    own_rec = swipe_data["recommendation_ids"][0]
+    with get_session() as session:
+        assert [card.recommendation_id for card in get_swipe_cards(session, user_id=user_id)] == [own_rec]
+
+        insert_history_batch(
+            session,
+            HistoryBatchCreate(
+                user_id=user_id,
+                items=[ViewingHistoryCreate(movie_id=swipe_data["movie_ids"][0], liked=True)],
+                recommendation_actions={own_rec: UserAction.LIKED},
+            ),
+        )
+        session.commit()
+
+        assert get_swipe_cards(session, user_id=user_id) == []
+
+
+def test_swipe_writes_stay_within_budget_from_fresh_session(swipe_data, count_queries):
+    user_id = swipe_data["user_id"]
+    movie_id = swipe_data["movie_ids"][0]
+    with get_session() as session:
+        watching_list = WatchingList(user_id=user_id, name="Watch Later")
+        session.add(watching_list)
+        session.commit()
+        watching_list_id = watching_list.id
+    assert watching_list_id is not None
+
+    batch = HistoryBatchCreate(
+        user_id=user_id,
+        items=[ViewingHistoryCreate(movie_id=movie_id, liked=True)],
+        recommendation_actions={swipe_data["recommendation_ids"][0]: UserAction.LIKED},
+    )
+    with get_session() as session:
+        with count_queries() as history_queries:
+            insert_history_batch(session, batch)
+        with count_queries() as list_queries:
+            add_to_watching_list(session, WatchingListItemCreate(watching_list_id=watching_list_id, movie_id=movie_id))
+        session.commit()
+
+    assert len(history_queries) == 3  # history upsert, vector invalidation, outcome update
+    assert len(list_queries) == 1
+
+
+def test_history_batch_requires_single_owner():
+    with pytest.raises(ValidationError):
+        HistoryBatchCreate(items=[])
+
+    with pytest.raises(ValidationError):
+        HistoryBatchCreate(user_id=1, guest_session_id=2, items=[])
+
+
+def test_queue_swipe_flushes_at_batch_size(swipe_data):
+    user_id = swipe_data["user_id"]
+
+    written = [
+        queue_swipe(ViewingHistoryCreate(movie_id=movie_id, liked=True), user_id=user_id)
+        for movie_id in swipe_data["movie_ids"]
+    ]
+
+    assert written == [0] * (SWIPE_FLUSH_SIZE - 1) + [SWIPE_FLUSH_SIZE]
+    with get_session() as session:
+        assert len(session.exec(select(ViewingHistory)).all()) == SWIPE_FLUSH_SIZE
+
+
+def test_flush_swipes_writes_partial_buffer(swipe_data):
+    user_id = swipe_data["user_id"]
+    own_rec = swipe_data["recommendation_ids"][0]
+
+    queue_swipe(
+        ViewingHistoryCreate(movie_id=swipe_data["movie_ids"][0], liked=True),
+        user_id=user_id,
+        recommendation_id=own_rec,
+        action=UserAction.WATCHED_AND_LIKED,
+    )
+    flush_swipes(user_id=user_id)
+    assert flush_swipes(user_id=user_id) == 0
+
+    with get_session() as session:
+        assert len(session.exec(select(ViewingHistory)).all()) == 1
+        recommendation = session.get(Recommendation, own_rec)
+        assert recommendation is not None
+        assert recommendation.user_action == UserAction.WATCHED_AND_LIKED
+
+
+def test_flush_stale_swipes_writes_only_aged_buffers(swipe_data):
+    user_id = swipe_data["user_id"]
+    queue_swipe(ViewingHistoryCreate(movie_id=swipe_data["movie_ids"][0], liked=True), user_id=user_id)
+
+    assert flush_stale_swipes() == 0  # just buffered, not due yet
+    assert flush_stale_swipes(max_age_seconds=0) == 1
+    assert flush_swipes(user_id=user_id) == 0
+
+
+def test_failed_write_is_requeued_without_blocking_other_owners(swipe_data):
+    user_id, other_id = swipe_data["user_id"], swipe_data["other_id"]
+    queue_swipe(ViewingHistoryCreate(movie_id=swipe_data["movie_ids"][0], liked=True), user_id=user_id)
+    queue_swipe(ViewingHistoryCreate(movie_id=999_999, liked=True), user_id=other_id)  # FK violation
+
+    assert flush_stale_swipes(max_age_seconds=0) == 1  # the healthy owner is still written
+    assert list(swipe_service._PENDING) == [(other_id, None)]  # the failed batch is kept for a retry
+
+    for _ in range(SWIPE_MAX_WRITE_ATTEMPTS - 1):
+        assert flush_stale_swipes(max_age_seconds=0) == 0
+    assert swipe_service._PENDING == {}  # given up after SWIPE_MAX_WRITE_ATTEMPTS
+
+    with get_session() as session:
+        assert [entry.user_id for entry in session.exec(select(ViewingHistory)).all()] == [user_id]
+
+
+def test_end_swipe_session_flushes_buffer(swipe_data):
+    user_id = swipe_data["user_id"]
+    with get_session() as session:
+        swipe_session = SwipeSession(user_id=user_id)
+        session.add(swipe_session)
+        session.commit()
+        swipe_session_id = swipe_session.id
+    assert swipe_session_id is not None
+
+    queue_swipe(ViewingHistoryCreate(movie_id=swipe_data["movie_ids"][0], liked=True), user_id=user_id)
+    ended = end_swipe_session(swipe_session_id)
+
+    assert ended is not None and ended.ended_at is not None
+    assert end_swipe_session(swipe_session_id + 1000) is None
+    with get_session() as session:
+        assert len(session.exec(select(ViewingHistory)).all()) == 1
+
+
+def test_queue_swipe_requires_owner():
+    with pytest.raises(ValueError):
+        queue_swipe(ViewingHistoryCreate(movie_id=1, liked=True))